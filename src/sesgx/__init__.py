@@ -1,5 +1,7 @@
 from .sesgx import (
+    BatchWordEnrichmentModel,
     DefaultStringFormulationModel,
+    EnrichBatchMixin,
     SeSG,
     StringFormulationModel,
     StringFormulationModelForEnrichment,
@@ -11,6 +13,8 @@ __all__ = [
     "SeSG",
     "TopicExtractionModel",
     "WordEnrichmentModel",
+    "BatchWordEnrichmentModel",
+    "EnrichBatchMixin",
     "StringFormulationModel",
     "DefaultStringFormulationModel",
     "StringFormulationModelForEnrichment",
@@ -1,11 +1,29 @@
-from typing import Dict, Iterable, List, Literal, Protocol
+import math
+import sys
+import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Protocol,
+    Tuple,
+)
 
 
 class TopicExtractionModel(Protocol):
     """Interface for a topic extraction model that can be used with SeSG.
 
     Must have a method `extract` that receives a list of documents and returns a list of topics.
-    """
+
+    May have a method `extract_shard` that receives a slice of the documents and returns the topics for that slice. If present, SeSG can split the documents into shards and extract their topics in parallel processes (see `SeSG.n_processes`), so the model must be picklable. Only implement it if extracting topics from each shard independently is acceptable for the model.
+    """  # noqa: E501
 
     def extract(self, docs: List[str]) -> List[List[str]]: ...
 
@@ -14,27 +32,67 @@ class WordEnrichmentModel(Protocol):
     """Interface for a word enrichment model that can be used with SeSG.
 
     Must have a method `enrich` that receives a word and returns a list of enriched words.
+
+    May also have a method `enrich_batch`, see `BatchWordEnrichmentModel`.
     """
 
     def enrich(self, word: str) -> List[str]: ...
 
 
+class BatchWordEnrichmentModel(WordEnrichmentModel, Protocol):
+    """Interface for a word enrichment model that can also enrich words in batches.
+
+    Must have a method `enrich_batch` that receives a list of words and returns a list of lists of enriched words, one for each word and in the same order. This is useful for models that are cheaper to run in batches (e.g., transformer based models). If present, SeSG uses it instead of `enrich`.
+    """  # noqa: E501
+
+    def enrich_batch(self, words: List[str]) -> List[List[str]]: ...
+
+
+class EnrichBatchMixin:
+    """Mixin that implements `enrich_batch` by calling `enrich` for each word.
+
+    Must be combined with a class that implements `WordEnrichmentModel`.
+    """
+
+    def enrich_batch(self: WordEnrichmentModel, words: List[str]) -> List[List[str]]:
+        return [self.enrich(word) for word in words]
+
+
 class StringFormulationModel(Protocol):
     """ "Interface for a string formulation model that can be used with SeSG.
 
     Must have a method `formulate` that receives the data for formulation and returns a string.
 
-    The data is represented as a list of dictionaries, where each dictionary represents a topic and has the original words as keys and the list of enriched words as values.
+    The data is represented as an iterable of dictionaries, which may be consumed only once, where each dictionary represents a topic and has the original words as keys and the list of enriched words as values.
     """
 
-    def formulate(self, data: List[Dict[str, List[str]]]) -> str: ...
+    def formulate(self, data: Iterable[Dict[str, List[str]]]) -> str: ...
+
+
+# shared result of `DefaultWordEnrichmentModel.enrich`, must never be mutated
+_NO_ENRICHMENT: List[str] = []
 
 
 class DefaultWordEnrichmentModel(WordEnrichmentModel):
-    """Default word enrichment model. Does not perform the enrichment, i.e., returns an empty list."""
+    """Default word enrichment model. Does not perform the enrichment, i.e., returns an empty list.
+
+    The same empty list is returned on every call, so it must not be mutated.
+    """
 
     def enrich(self, word: str) -> List[str]:
-        return []
+        return _NO_ENRICHMENT
+
+
+# separator placed between tokens, indexed by operator
+_SEPS: Dict[str, str] = {"AND": " AND ", "OR": " OR "}
+
+# (prefix, suffix) surrounding each token, indexed by (use_double_quotes, use_parenthesis)
+_TOKEN_AFFIXES: Dict[Tuple[bool, bool], Tuple[str, str]] = {
+    (False, False): ("", ""),
+    (True, False): ('"', '"'),
+    (False, True): ("(", ")"),
+    (True, True): ('("', '")'),
+}
 
 
 def _join_tokens_with_operator(
@@ -49,6 +107,8 @@ def _join_tokens_with_operator(
     First checks if should surround with double quotes, then checks if should surround with parenthesis.
     If both are set to True, will add both double quotes and parenthesis.
 
+    The formulation models no longer use this helper; it is kept for API compatibility.
+
     Args:
         operator (Literal["AND", "OR"]): Operator to use to join.
         tokens (Iterable[str]): Tokens to join.
@@ -62,13 +122,97 @@ def _join_tokens_with_operator(
         >>> _join_tokens_with_operator(["machine", "learning", "SLR"], "AND", use_double_quotes=True)
         '"machine" AND "learning" AND "SLR"'
     """  # noqa: E501
-    if use_double_quotes:
-        tokens = (f'"{token}"' for token in tokens)
+    separator = _SEPS[operator]
+    prefix, suffix = _TOKEN_AFFIXES[use_double_quotes, use_parenthesis]
+
+    if not prefix:
+        return separator.join(tokens)
 
-    if use_parenthesis:
-        tokens = (f"({token})" for token in tokens)
+    # the decoration is folded into the separator, so that str.join
+    # builds the whole string in C without a decorated copy of each token
+    if not isinstance(tokens, list):
+        tokens = list(tokens)
 
-    return f" {operator} ".join(tokens)
+    if not tokens:
+        return ""
+
+    return prefix + (suffix + separator + prefix).join(tokens) + suffix
+
+
+def _interleave(tokens: List[str], separator: str) -> List[str]:
+    """Places the separator between each pair of consecutive tokens.
+
+    Args:
+        tokens (List[str]): Tokens to interleave.
+        separator (str): Separator to place between the tokens.
+
+    Returns:
+        A list with the tokens and the separators, ready to be concatenated.
+
+    Examples:
+        >>> _interleave(["machine", "learning", "SLR"], " AND ")
+        ['machine', ' AND ', 'learning', ' AND ', 'SLR']
+    """
+    if not tokens:
+        return []
+
+    parts = [separator] * (2 * len(tokens) - 1)
+    parts[::2] = tokens
+
+    return parts
+
+
+def _format_terms(terms: Collection[str]) -> str:
+    """Formats the terms of a word (the word followed by its enriched words) as a single term of a search string.
+
+    Args:
+        terms (Collection[str]): The original word followed by its enriched words.
+
+    Returns:
+        The quoted word if it is the only term, otherwise all the terms joined with "OR" and surrounded by parenthesis.
+
+    Examples:
+        >>> _format_terms(["machine", "computer"])
+        '("machine" OR "computer")'
+    """  # noqa: E501
+    # a word without enrichment is a single term,
+    # so it does not need to be joined nor surrounded by parenthesis
+    if len(terms) == 1:
+        (word,) = terms
+        return f'"{word}"'
+
+    # enriched words are joined with "OR"
+    # since they are *synonyms
+    # *not necessarily synonyms, but words that are related to the original word
+    # the quotes are part of the separator, so no quoted copy of each word is built
+    return '("' + '" OR "'.join(terms) + '")'
+
+
+def _format_word(word: str, enriched_words: List[str]) -> str:
+    """Formats a word and its enriched words as a single term of a search string.
+
+    Args:
+        word (str): Original word.
+        enriched_words (List[str]): Words enriched from the original word.
+
+    Returns:
+        The quoted word if there are no enriched words, otherwise all the words joined with "OR" and surrounded by parenthesis.
+
+    Examples:
+        >>> _format_word("machine", ["computer"])
+        '("machine" OR "computer")'
+    """  # noqa: E501
+    return _format_terms([word, *enriched_words])
+
+
+def _format_word_deduped(word: str, enriched_words: List[str]) -> str:
+    """Same as `_format_word`, but keeps only the first occurrence of repeated words.
+
+    Examples:
+        >>> _format_word_deduped("machine", ["machine", "computer", "computer"])
+        '("machine" OR "computer")'
+    """
+    return _format_terms(dict.fromkeys([word, *enriched_words]))
 
 
 class StringFormulationModelForEnrichment(StringFormulationModel):
@@ -81,48 +225,57 @@ class StringFormulationModelForEnrichment(StringFormulationModel):
     1. Topics are joined with "OR" since each topic describe a set of documents and a document can be described by multiple topics.
     """
 
-    def formulate(self, data: List[Dict[str, List[str]]]) -> str:
-        topics_part: List[str] = []
+    dedupe: bool
+
+    def __init__(self, dedupe: bool = True):
+        """Initializes the string formulation model.
+
+        - If `dedupe` is `True`, repeated words among a word and its enriched words (e.g., when the enrichment returns the original word) are kept only once, preserving their order.
+        """
+        self.dedupe = dedupe
+
+    def formulate(self, data: Iterable[Dict[str, List[str]]]) -> str:
+        # flatten the topics into parallel lists of words and enriched words,
+        # keeping the boundaries of each topic,
+        # so that all the words are formatted in a single flat pass
+        words: List[str] = []
+        enrichments: List[List[str]] = []
+        bounds: List[int] = [0]
 
         for topic in data:
-            enriched_words_part: List[str] = []
+            words.extend(topic.keys())
+            enrichments.extend(topic.values())
+            bounds.append(len(words))
+
+        # the `dedupe` flag is evaluated once here, instead of once for every word
+        format_word = _format_word_deduped if self.dedupe else _format_word
+        words_part = [
+            format_word(word, enriched_words)
+            for word, enriched_words in zip(words, enrichments)
+        ]
 
-            for word, enriched_words in topic.items():
-                # enriched words are joined with "OR"
-                # since they are *synonyms
-                # *not necessarily synonyms, but words that are related to the original word
-                s = _join_tokens_with_operator(
-                    [word, *enriched_words],
-                    "OR",
-                    use_double_quotes=True,
-                )
+        # the search string is built from a flat list of parts joined once,
+        # instead of joining each topic and then joining the topics again
+        parts: List[str] = []
 
-                enriched_words_part.append(s)
+        for start, end in zip(bounds, bounds[1:]):
+            # topics are joined with "OR"
+            # since a document can be related to multiple topics
+            # and also, since a topic describes a document,
+            # we want to find all relevand documents as an UNION
+            # hence, we use "OR"
+            parts.append(") OR (" if parts else "(")
 
             # terms of topics (in this case, sets of enriched words)
             # are joined with "AND"
             # since they are related to the same topic
             # and we assume that a topic describes a document
-            s = _join_tokens_with_operator(
-                enriched_words_part,
-                "AND",
-                use_parenthesis=True,
-            )
-
-            topics_part.append(s)
-
-        # topics are joined with "OR"
-        # since a document can be related to multiple topics
-        # and also, since a topic describes a document,
-        # we want to find all relevand documents as an UNION
-        # hence, we use "OR"
-        string = _join_tokens_with_operator(
-            topics_part,
-            "OR",
-            use_parenthesis=True,
-        )
+            parts.extend(_interleave(words_part[start:end], " AND "))
 
-        return string
+        if parts:
+            parts.append(")")
+
+        return "".join(parts)
 
 
 class DefaultStringFormulationModel(StringFormulationModel):
@@ -134,43 +287,151 @@ class DefaultStringFormulationModel(StringFormulationModel):
     1. Topics are joined with "OR" since each topic describe a set of documents and a document can be described by multiple topics.
     """
 
-    def formulate(self, data: List[Dict[str, List[str]]]) -> str:
-        topics_part: List[str] = []
+    def formulate(self, data: Iterable[Dict[str, List[str]]]) -> str:
+        # the search string is built from a flat list of parts joined once,
+        # instead of joining each topic and then joining the topics again
+        parts: List[str] = []
 
         for topic in data:
-            topic_words = list(topic.keys())
-            s = _join_tokens_with_operator(
-                topic_words,
-                "AND",
-                use_double_quotes=True,
-            )
-
-            topics_part.append(s)
-
-        # topics are joined with "OR"
-        string = _join_tokens_with_operator(
-            topics_part,
-            "OR",
-            use_parenthesis=True,
-        )
+            # topics are joined with "OR"
+            parts.append(") OR (" if parts else "(")
 
-        return string
+            if topic:
+                parts.append('"')
+                parts.extend(_interleave(list(topic), '" AND "'))
+                parts.append('"')
+
+        if parts:
+            parts.append(")")
+
+        return "".join(parts)
+
+
+def _enrich_word_or_skip(
+    enrich: Callable[[str], List[str]],
+    word: str,
+) -> List[str]:
+    """Enriches a word, returning an empty list (i.e., no enrichment) if the model fails.
+
+    Args:
+        enrich (Callable[[str], List[str]]): The `enrich` method of the word enrichment model to use.
+        word (str): Word to enrich.
+
+    Returns:
+        The list of enriched words, or an empty list if the enrichment raised an exception.
+    """  # noqa: E501
+    try:
+        return enrich(word)
+    except Exception as e:
+        warnings.warn(
+            f"Failed to enrich word {word!r}, it will not be enriched: {e!r}",
+            RuntimeWarning,
+        )
+        return []
 
 
 def _enrich_topic(
-    topic: List[str],
+    topic: Iterable[str],
     word_enrichment_model: WordEnrichmentModel,
+    executor: Executor | None = None,
 ) -> Dict[str, List[str]]:
     """Enriches a topic using the provided word enrichment model.
 
+    A word that fails to be enriched is kept without enrichment, and a `RuntimeWarning` is emitted, instead of aborting the whole topic. If `enrich_batch` fails, the words are enriched one by one with `enrich`.
+
     Args:
-        topic (List[str]): Topic to enrich.
+        topic (Iterable[str]): Topic to enrich.
         word_enrichment_model (WordEnrichmentModel): Word enrichment model to use.
+        executor (Optional[Executor]): If provided, the words are enriched concurrently using the executor, calling `enrich` for each word. Otherwise, all the words are enriched with a single call to `enrich_batch`, if the model provides it.
 
     Returns:
         A dictionary with the original words as keys and the list of enriched words as values.
+    """  # noqa: E501
+    # the method is bound once, instead of looking it up for every word
+    enrich_word = partial(_enrich_word_or_skip, word_enrichment_model.enrich)
+
+    if executor is not None:
+        words = list(topic)
+        return dict(zip(words, executor.map(enrich_word, words)))
+
+    # `enrich_batch` is optional, see `BatchWordEnrichmentModel`
+    enrich_batch = getattr(word_enrichment_model, "enrich_batch", None)
+
+    # the default `enrich_batch` only calls `enrich` for each word, so a failing word
+    # would abort the batch and have every word enriched again one by one
+    if (
+        enrich_batch is None
+        or getattr(type(word_enrichment_model), "enrich_batch", None)
+        is EnrichBatchMixin.enrich_batch
+    ):
+        return {word: enrich_word(word) for word in topic}
+
+    words = list(topic)
+
+    try:
+        enriched_words = enrich_batch(words)
+    except Exception as e:
+        warnings.warn(
+            f"Failed to enrich words in a batch, enriching them one by one: {e!r}",
+            RuntimeWarning,
+        )
+        return {word: enrich_word(word) for word in words}
+
+    if len(enriched_words) != len(words):
+        raise ValueError(
+            f"{type(word_enrichment_model).__name__}.enrich_batch returned "
+            f"{len(enriched_words)} results for {len(words)} words"
+        )
+
+    return dict(zip(words, enriched_words))
+
+
+def _enrich_topics_memoized(
+    topics: List[List[str]],
+    word_enrichment_model: WordEnrichmentModel,
+    executor: Executor | None = None,
+) -> Iterator[Dict[str, List[str]]]:
+    """Enriches the topics calling the word enrichment model only once per unique word.
+
+    Words that appear in more than one topic share the same list of enriched words.
+
+    Args:
+        topics (List[List[str]]): Topics to enrich.
+        word_enrichment_model (WordEnrichmentModel): Word enrichment model to use.
+        executor (Optional[Executor]): Executor used to enrich the unique words concurrently. See `_enrich_topic`.
+
+    Returns:
+        An iterator with one dictionary per topic, mapping the original words to the list of enriched words.
+    """  # noqa: E501
+    # words are interned, since the same words are usually shared among many topics
+    # str subclasses (e.g., `numpy.str_`) cannot be interned, so they are kept as is
+    unique_words = dict.fromkeys(
+        sys.intern(word) if type(word) is str else word
+        for topic in topics
+        for word in topic
+    )
+    cache = _enrich_topic(unique_words, word_enrichment_model, executor)
+
+    return ({word: cache[word] for word in topic} for topic in topics)
+
+
+def _split_into_shards(docs: List[str], n_shards: int) -> List[List[str]]:
+    """Splits the documents into at most `n_shards` contiguous shards of similar size.
+
+    Args:
+        docs (List[str]): Documents to split.
+        n_shards (int): Maximum number of shards.
+
+    Returns:
+        The list of shards, in the same order as the documents.
+
+    Examples:
+        >>> _split_into_shards(["a", "b", "c", "d", "e"], 2)
+        [['a', 'b', 'c'], ['d', 'e']]
     """
-    return {word: word_enrichment_model.enrich(word) for word in topic}
+    shard_size = math.ceil(len(docs) / n_shards)
+
+    return [docs[i : i + shard_size] for i in range(0, len(docs), shard_size)]
 
 
 class SeSG:
@@ -179,17 +440,27 @@ class SeSG:
     topic_extraction_model: TopicExtractionModel
     word_enrichment_model: WordEnrichmentModel
     string_formulation_model: StringFormulationModel
+    memoize_enrichment: bool
+    max_workers: int | None
+    n_processes: int
 
     def __init__(
         self,
         topic_extraction_model: TopicExtractionModel,
         word_enrichment_model: WordEnrichmentModel | None = None,
         string_formulation_model: StringFormulationModel | None = None,
+        memoize_enrichment: bool = True,
+        max_workers: int | None = None,
+        n_processes: int = 1,
     ):
         """Initializes the SeSG framework.
 
         - If `word_enrichment_model` is not provided, will not perform word enrichment.
         - If `string_formulation_model` is not provided, will use the default string formulation model which only works with topics that were not enriched.
+        - If `memoize_enrichment` is `True`, each unique word is enriched only once per call to `generate`, even if it appears in multiple topics. Set it to `False` if the word enrichment model is not deterministic and every occurrence should be enriched independently.
+        - If `max_workers` is greater than 1, words are enriched concurrently using a thread pool with that many workers, which helps when the word enrichment model is I/O bound. Otherwise, the words are enriched in batches through `enrich_batch`.
+        - In every case, a word whose enrichment fails is kept without enrichment and a `RuntimeWarning` is emitted, instead of aborting the generation.
+        - If `n_processes` is greater than 1 and the topic extraction model has an `extract_shard` method, the documents are split into `n_processes` shards whose topics are extracted in parallel processes and concatenated in order. Otherwise, `extract` is called once with all the documents.
         """
         self.topic_extraction_model = topic_extraction_model
         self.word_enrichment_model = (
@@ -198,21 +469,63 @@ class SeSG:
         self.string_formulation_model = (
             string_formulation_model or DefaultStringFormulationModel()
         )
+        self.memoize_enrichment = memoize_enrichment
+        self.max_workers = max_workers
+        self.n_processes = n_processes
+
+    def _extract_topics(self, docs: List[str]) -> List[List[str]]:
+        extract_shard = getattr(self.topic_extraction_model, "extract_shard", None)
+
+        if self.n_processes <= 1 or extract_shard is None or not docs:
+            return self.topic_extraction_model.extract(docs)
+
+        shards = _split_into_shards(docs, self.n_processes)
+
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            return [
+                topic
+                for shard_topics in executor.map(extract_shard, shards)
+                for topic in shard_topics
+            ]
+
+    def _enrich_topics(
+        self,
+        topics: List[List[str]],
+        executor: Executor | None = None,
+    ) -> Iterator[Dict[str, List[str]]]:
+        if self.memoize_enrichment:
+            return _enrich_topics_memoized(topics, self.word_enrichment_model, executor)
+
+        word_enrichment_model = self.word_enrichment_model
+
+        return (
+            _enrich_topic(topic, word_enrichment_model, executor) for topic in topics
+        )
 
     def generate(self, docs: List[str]) -> str:
         """Generates a search string using the provided models.
 
+        The enriched topics are passed to `string_formulation_model.formulate` as a one-shot iterator, which is consumed as the topics are enriched. A custom string formulation model must iterate over it only once, and must not call `len` on it or index it; it should convert it to a list first if it needs to. With `memoize_enrichment` enabled (the default), the enriched words of all the topics are computed before formulation starts, so only the per-topic dictionaries are streamed.
+
         Args:
             docs (List[str]): List of documents, where each document represents a relevant study. The document can include, for example, the title, abstract, and keywords of the study.
 
         Returns:
             The search string.
         """
-        topics = self.topic_extraction_model.extract(docs)
-        enriched_topics = [
-            _enrich_topic(topic, self.word_enrichment_model) for topic in topics
-        ]
+        topics = self._extract_topics(docs)
+
+        # a thread pool is only worth its overhead with more than one worker
+        executor = (
+            None
+            if self.max_workers in (None, 1)
+            else ThreadPoolExecutor(max_workers=self.max_workers)
+        )
 
-        search_string = self.string_formulation_model.formulate(enriched_topics)
+        # the enriched topics are streamed into the string formulation model,
+        # so the executor must stay open until the search string is built
+        with executor or nullcontext():
+            enriched_topics = self._enrich_topics(topics, executor)
+            search_string = self.string_formulation_model.formulate(enriched_topics)
 
         return search_string
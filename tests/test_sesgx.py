@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 
 import pytest
 from sesgx import sesgx
@@ -66,6 +67,20 @@ def test_default_word_enrichment_model_should_return_empty_list():
             True,
             '("machine") AND ("learning") AND ("computer")',
         ),
+        (
+            [],
+            "AND",
+            True,
+            True,
+            "",
+        ),
+        (
+            [""],
+            "OR",
+            True,
+            False,
+            '""',
+        ),
     ],
 )
 def test_join_tokens_with_operator(
@@ -196,3 +211,303 @@ def test_sesg_with_word_enrichment_should_work_as_expected():
     expected = '(("machine" OR "machine_1") AND ("learning" OR "learning_1")) OR (("computer" OR "computer_1") AND ("science" OR "science_1"))'
 
     assert result == expected
+
+
+@dataclass
+class CountingWordEnrichmentModel(sesgx.WordEnrichmentModel):
+    calls: int = 0
+
+    def enrich(self, word: str) -> list[str]:
+        self.calls += 1
+        return [f"{word}_{self.calls}"]
+
+
+def test_enrich_topics_memoized_should_enrich_each_unique_word_once():
+    word_enrichment_model = CountingWordEnrichmentModel()
+    topics = [["machine", "learning"], ["deep", "learning"]]
+
+    result = list(sesgx._enrich_topics_memoized(topics, word_enrichment_model))
+
+    assert word_enrichment_model.calls == 3
+    assert result == [
+        {"machine": ["machine_1"], "learning": ["learning_2"]},
+        {"deep": ["deep_3"], "learning": ["learning_2"]},
+    ]
+
+
+def test_sesg_should_enrich_every_occurrence_when_memoization_is_disabled():
+    topic_extraction_model = MockedTopicExtractionModel(n_words_per_topic=2)
+    word_enrichment_model = CountingWordEnrichmentModel()
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=topic_extraction_model,
+        word_enrichment_model=word_enrichment_model,
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+        memoize_enrichment=False,
+    )
+
+    result = sesg.generate(["machine,learning", "deep,learning"])
+    expected = '(("machine" OR "machine_1") AND ("learning" OR "learning_2")) OR (("deep" OR "deep_3") AND ("learning" OR "learning_4"))'
+
+    assert word_enrichment_model.calls == 4
+    assert result == expected
+
+
+@dataclass
+class FailingWordEnrichmentModel(sesgx.WordEnrichmentModel):
+    failing_word: str
+
+    def enrich(self, word: str) -> list[str]:
+        if word == self.failing_word:
+            raise ValueError(word)
+
+        return [f"{word}_1"]
+
+
+@pytest.mark.parametrize("memoize_enrichment", [True, False])
+def test_sesg_with_thread_pool_should_work_as_expected(memoize_enrichment):
+    topic_extraction_model = MockedTopicExtractionModel(n_words_per_topic=2)
+    word_enrichment_model = MockedWordEnrichmentModel(n_enrichments=1)
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=topic_extraction_model,
+        word_enrichment_model=word_enrichment_model,
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+        memoize_enrichment=memoize_enrichment,
+        max_workers=4,
+    )
+
+    result = sesg.generate(["machine,learning", "computer,science"])
+    expected = '(("machine" OR "machine_1") AND ("learning" OR "learning_1")) OR (("computer" OR "computer_1") AND ("science" OR "science_1"))'
+
+    assert result == expected
+
+
+def test_enrich_topic_with_executor_should_skip_words_that_fail():
+    word_enrichment_model = FailingWordEnrichmentModel(failing_word="learning")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.warns(RuntimeWarning, match="learning"):
+            enriched_topic = sesgx._enrich_topic(
+                ["machine", "learning"],
+                word_enrichment_model,
+                executor,
+            )
+
+    assert enriched_topic == {"machine": ["machine_1"], "learning": []}
+
+
+@pytest.mark.parametrize("max_workers", [None, 1, 2])
+def test_sesg_should_skip_words_that_fail_regardless_of_max_workers(max_workers):
+    topic_extraction_model = MockedTopicExtractionModel(n_words_per_topic=2)
+    word_enrichment_model = FailingWordEnrichmentModel(failing_word="learning")
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=topic_extraction_model,
+        word_enrichment_model=word_enrichment_model,
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+        max_workers=max_workers,
+    )
+
+    with pytest.warns(RuntimeWarning, match="learning"):
+        result = sesg.generate(["machine,learning"])
+
+    expected = '(("machine" OR "machine_1") AND "learning")'
+    assert result == expected
+
+
+@dataclass
+class BatchedWordEnrichmentModel(sesgx.BatchWordEnrichmentModel):
+    batches: list[list[str]] = field(default_factory=list)
+
+    def enrich(self, word: str) -> list[str]:
+        raise AssertionError("enrich_batch should be used instead")
+
+    def enrich_batch(self, words: list[str]) -> list[list[str]]:
+        self.batches.append(words)
+        return [[f"{word}_1"] for word in words]
+
+
+@dataclass
+class MockedWordEnrichmentModelWithBatch(
+    sesgx.EnrichBatchMixin, MockedWordEnrichmentModel
+):
+    pass
+
+
+def test_enrich_batch_mixin_should_call_enrich_for_each_word():
+    word_enrichment_model = MockedWordEnrichmentModelWithBatch(n_enrichments=1)
+
+    result = word_enrichment_model.enrich_batch(["machine", "learning"])
+    expected = [["machine_1"], ["learning_1"]]
+
+    assert result == expected
+
+
+def test_sesg_should_enrich_unique_words_in_a_single_batch():
+    topic_extraction_model = MockedTopicExtractionModel(n_words_per_topic=2)
+    word_enrichment_model = BatchedWordEnrichmentModel()
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=topic_extraction_model,
+        word_enrichment_model=word_enrichment_model,
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+    )
+
+    result = sesg.generate(["machine,learning", "deep,learning"])
+    expected = '(("machine" OR "machine_1") AND ("learning" OR "learning_1")) OR (("deep" OR "deep_1") AND ("learning" OR "learning_1"))'
+
+    assert word_enrichment_model.batches == [["machine", "learning", "deep"]]
+    assert result == expected
+
+
+def test_string_formulation_model_for_enrichment_should_remove_repeated_words():
+    data = [{"machine": ["machine", "ml", "ml"], "learning": ["learning_1"]}]
+
+    result = sesgx.StringFormulationModelForEnrichment().formulate(data)
+    expected = '(("machine" OR "ml") AND ("learning" OR "learning_1"))'
+    assert result == expected
+
+    result = sesgx.StringFormulationModelForEnrichment(dedupe=False).formulate(data)
+    expected = (
+        '(("machine" OR "machine" OR "ml" OR "ml") AND ("learning" OR "learning_1"))'
+    )
+    assert result == expected
+
+
+def test_string_formulation_model_for_enrichment_should_not_surround_words_without_enrichment():
+    string_formulation_model = sesgx.StringFormulationModelForEnrichment()
+
+    result = string_formulation_model.formulate(
+        [
+            {"machine": [], "learning": ["ml"]},
+            {"computer": ["computer"], "science": []},
+        ]
+    )
+    expected = '("machine" AND ("learning" OR "ml")) OR ("computer" AND "science")'
+    assert result == expected
+
+
+@dataclass
+class ShardedTopicExtractionModel(MockedTopicExtractionModel):
+    def extract(self, docs: list[str]) -> list[list[str]]:
+        raise AssertionError("extract_shard should be used instead")
+
+    def extract_shard(self, docs: list[str]) -> list[list[str]]:
+        return super().extract(docs)
+
+
+def test_sesg_should_extract_topics_from_shards_in_parallel():
+    topic_extraction_model = ShardedTopicExtractionModel(n_words_per_topic=2)
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=topic_extraction_model,
+        n_processes=2,
+    )
+
+    result = sesg.generate(["machine,learning", "computer,science", "deep,learning"])
+    expected = '("machine" AND "learning") OR ("computer" AND "science") OR ("deep" AND "learning")'
+
+    assert result == expected
+
+
+@dataclass
+class ShortBatchWordEnrichmentModel(sesgx.BatchWordEnrichmentModel):
+    def enrich(self, word: str) -> list[str]:
+        return [f"{word}_1"]
+
+    def enrich_batch(self, words: list[str]) -> list[list[str]]:
+        return [self.enrich(word) for word in words[:-1]]
+
+
+@pytest.mark.parametrize("memoize_enrichment", [True, False])
+def test_sesg_should_fail_when_enrich_batch_returns_wrong_number_of_results(
+    memoize_enrichment,
+):
+    sesg = sesgx.SeSG(
+        topic_extraction_model=MockedTopicExtractionModel(n_words_per_topic=2),
+        word_enrichment_model=ShortBatchWordEnrichmentModel(),
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+        memoize_enrichment=memoize_enrichment,
+    )
+
+    with pytest.raises(ValueError, match="ShortBatchWordEnrichmentModel"):
+        sesg.generate(["machine,learning"])
+
+
+class StrSubclass(str):
+    pass
+
+
+def test_sesg_should_work_with_str_subclasses_as_words():
+    @dataclass
+    class StrSubclassTopicExtractionModel(sesgx.TopicExtractionModel):
+        def extract(self, docs: list[str]) -> list[list[str]]:
+            return [[StrSubclass(word) for word in doc.split(",")] for doc in docs]
+
+    sesg = sesgx.SeSG(
+        topic_extraction_model=StrSubclassTopicExtractionModel(),
+        word_enrichment_model=MockedWordEnrichmentModel(n_enrichments=1),
+        string_formulation_model=sesgx.StringFormulationModelForEnrichment(),
+    )
+
+    result = sesg.generate(["machine,learning"])
+    expected = '(("machine" OR "machine_1") AND ("learning" OR "learning_1"))'
+
+    assert result == expected
+
+
+@dataclass
+class CountingFailingWordEnrichmentModel(
+    sesgx.EnrichBatchMixin, sesgx.WordEnrichmentModel
+):
+    failing_word: str
+    calls: list[str] = field(default_factory=list)
+
+    def enrich(self, word: str) -> list[str]:
+        self.calls.append(word)
+        if word == self.failing_word:
+            raise ValueError(word)
+
+        return [f"{word}_1"]
+
+
+def test_enrich_topic_should_enrich_each_word_once_when_a_word_fails():
+    word_enrichment_model = CountingFailingWordEnrichmentModel(failing_word="z")
+
+    with pytest.warns(RuntimeWarning, match="'z'"):
+        enriched_topic = sesgx._enrich_topic(
+            ["a", "b", "c", "z"], word_enrichment_model
+        )
+
+    assert word_enrichment_model.calls == ["a", "b", "c", "z"]
+    assert enriched_topic == {"a": ["a_1"], "b": ["b_1"], "c": ["c_1"], "z": []}
+
+
+@pytest.mark.parametrize(
+    "string_formulation_model,expected",
+    [
+        (
+            sesgx.DefaultStringFormulationModel(),
+            '("machine" AND "learning") OR ("computer" AND "science")',
+        ),
+        (
+            sesgx.StringFormulationModelForEnrichment(),
+            '(("machine" OR "ml") AND "learning") OR ("computer" AND "science")',
+        ),
+    ],
+)
+def test_string_formulation_models_should_accept_a_one_shot_iterator(
+    string_formulation_model,
+    expected,
+):
+    data = iter(
+        [
+            {"machine": ["ml"], "learning": []},
+            {"computer": [], "science": []},
+        ]
+    )
+
+    result = string_formulation_model.formulate(data)
+
+    assert result == expected